@@ -0,0 +1,223 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib import interpreter as I
+from lib.driver import parse_file
+
+
+def run_source(source, argv=()):
+    with tempfile.NamedTemporaryFile('w', suffix='.rail',
+                                     delete=False) as f:
+        f.write(source)
+    try:
+        module = parse_file(f.name)
+    finally:
+        os.remove(f.name)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        module.main(list(argv))
+    return out.getvalue()
+
+
+def in_main(*lines):
+    body = ''.join(f'    {line}\n' for line in lines)
+    return f'func main(argv)()\n{body}return ()\n'
+
+
+ARITHMETIC_SOURCE = in_main(
+    'let a = 7',
+    'let b = -7',
+    'let h = 1/2',
+    'let z = 0',
+    'println(a // 2, b // 2, a % 3, b % 3, a / 2, b / 2)',
+    'println(h + 1/3, h - 1, h * 4, a ** 2, 2 ** b, h // (1/3), h % (1/3))',
+    'println(a < 8, a <= 7, a > 7, a >= 8, a == 7, a != 7, h < 1/3, h == 2/4)',
+    'println(a + h, a - a, -a, -z, !z, !a, a ^ 1, a ^ z)',
+    'println(z & (a / z), a | (a / z), a & h, z | z)',
+    'unlet z = 0',
+    'unlet h = 1/2',
+    'unlet b = -7',
+    'unlet a = 7')
+
+ARITHMETIC_OUTPUT = '''\
+3 -4 1 2 7/2 -7/2
+5/6 -1/2 2 49 1/128 1 1/6
+1 1 0 0 1 0 0 1
+15/2 0 -7 0 1 0 0 1
+0 1 1 0
+'''
+
+MODIFY_SOURCE = in_main(
+    'let a = [[1, 2], [3]]',
+    'let i = 1',
+    'a[1][0] += 2',
+    'a[0][i] *= 3',
+    'a[i - 1][-1] -= 1',
+    'println(a)',
+    'a[i - 1][-1] += 1',
+    'a[0][i] /= 3',
+    'a[1][0] -= 2',
+    'unlet i = 1',
+    'unlet a = [[1, 2], [3]]')
+
+# A catch inside an If inside a For sends time backwards through both blocks
+# and the Try, which then moves on to its next value
+NESTED_DIRECTION_SOURCE = in_main(
+    'let total = 0',
+    'try (x in [1 to 6])',
+    '    let y = 0',
+    '    for (z in [1, 2])',
+    '        y += z',
+    '        if (y > 2)',
+    '            catch (x < 4)',
+    '        fi (y > 2)',
+    '    rof',
+    '    unlet y = 3',
+    '    total += x',
+    'yrt',
+    'println(x, total)',
+    'unlet x = 4',
+    'unlet total = 4')
+
+DO_UNDO_SOURCE = in_main(
+    'let a = [1, 2, 3]',
+    'let s = 0',
+    'do',
+    '    for (i in [0 to #a])',
+    '        a[i] *= 2',
+    '    rof',
+    'yield',
+    '    for (x in a)',
+    '        s += x',
+    '    rof',
+    'undo',
+    'println(a, s)',
+    'unlet s = 12',
+    'unlet a = [1, 2, 3]')
+
+RECURSION_SOURCE = in_main(
+    'let n = 60',
+    'let total = 0',
+    'call Sum(n, total)',
+    'println(n, total)',
+    'uncall Sum(n, total)',
+    'println(n, total)',
+    'unlet total = 0',
+    'unlet n = 60') + '''
+func Sum(n, total)()
+    if (n > 0)
+        total += n
+        n -= 1
+        call Sum(n, total)
+        n += 1
+    fi (n > 0)
+return ()
+'''
+
+PRINT_SOURCE = in_main(
+    'let a = [[1, 2], [3, [4, 1/2]]]',
+    'println(a, [], [[], []], [[[1]]], -1/3)',
+    'println([[[1, 2], [3]], [[4]]], [1, [2, [3, [4]]]])',
+    'unlet a = [[1, 2], [3, [4, 1/2]]]')
+
+TENSOR_SOURCE = in_main(
+    'let t = [0 tensor [2, 3]]',
+    't[1][2] += 5',
+    'println(t)',
+    't[1][2] -= 5',
+    'unlet t = [0 tensor [2, 3]]',
+    'let u = [1/2 tensor [2, 1, 2]]',
+    'println(u, #u, #u[0])',
+    'unlet u = [1/2 tensor [2, 1, 2]]')
+
+
+class ExpressionTests(unittest.TestCase):
+
+    def test_arithmetic(self):
+        self.assertEqual(run_source(ARITHMETIC_SOURCE), ARITHMETIC_OUTPUT)
+
+    def test_division_by_zero(self):
+        for expr, message in [('a / z', '7 / 0'),
+                              ('a // z', '7 // 0'),
+                              ('a % z', '7 % 0'),
+                              ('z ** -1', '0 ** -1')]:
+            with self.subTest(expr=expr):
+                source = in_main('let a = 7', 'let z = 0', f'let b = {expr}')
+                with self.assertRaises(I.RailwayZeroError) as cm:
+                    run_source(source)
+                self.assertEqual(cm.exception.message, message)
+
+    def test_arrays_rejected(self):
+        for expr in ('a + 1', '1 < a', 'a ^ a'):
+            with self.subTest(expr=expr):
+                source = in_main('let a = [1]', f'let b = {expr}')
+                with self.assertRaises(I.RailwayTypeError):
+                    run_source(source)
+
+    def test_printing_nested_arrays(self):
+        self.assertEqual(run_source(PRINT_SOURCE),
+                         '[[1, 2], [3, [4, 1/2]]] [] [[], []] [[[1]]] -1/3\n'
+                         '[[[1, 2], [3]], [[4]]] [1, [2, [3, [4]]]]\n')
+
+    def test_tensors(self):
+        self.assertEqual(run_source(TENSOR_SOURCE),
+                         '[[0, 0, 0], [0, 0, 5]]\n'
+                         '[[[1/2, 1/2]], [[1/2, 1/2]]] 2 1\n')
+        source = in_main('let t = [0 tensor [2, 3]]',
+                         't[1][2] += 5',
+                         'unlet t = [0 tensor [2, 3]]')
+        with self.assertRaises(I.RailwayValueError):
+            run_source(source)
+
+
+class ModificationTests(unittest.TestCase):
+
+    def test_indexed_modification(self):
+        self.assertEqual(run_source(MODIFY_SOURCE), '[[1, 5], [5]]\n')
+
+    def test_indexed_modification_errors(self):
+        for target, error, message in [
+                ('a[5]', I.RailwayIndexError,
+                 'Out of bounds error accessing a[5]'),
+                ('a[1][3]', I.RailwayIndexError,
+                 'Out of bounds error accessing a[1][3]'),
+                ('a[0][1][0]', I.RailwayIndexError,
+                 'Indexing into number during lookup a[0][1][0]'),
+                ('n[0]', I.RailwayIndexError,
+                 'Indexing into n which is a number'),
+                ('a[b]', I.RailwayTypeError,
+                 'Using array as index into "a"'),
+                ('a[1]', I.RailwayValueError,
+                 'Modification operation "+=" does not support arrays')]:
+            with self.subTest(target=target):
+                source = in_main('let a = [[1, 2], [3]]', 'let b = [0]',
+                                 'let n = 4', f'{target} += 1')
+                with self.assertRaises(error) as cm:
+                    run_source(source)
+                self.assertEqual(cm.exception.message, message)
+
+
+class ControlFlowTests(unittest.TestCase):
+
+    def test_direction_change_in_nested_blocks(self):
+        self.assertEqual(run_source(NESTED_DIRECTION_SOURCE), '4 4\n')
+
+    def test_do_undo(self):
+        self.assertEqual(run_source(DO_UNDO_SOURCE), '[1, 2, 3] 12\n')
+
+    def test_recursion(self):
+        # Deeper than the scope pool, and run twice so that pooled scopes
+        # are reused
+        for _ in range(2):
+            self.assertEqual(run_source(RECURSION_SOURCE),
+                             '60 1830\n60 0\n')
+        self.assertLessEqual(len(I._scope_pool), I._SCOPE_POOL_SIZE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import itertools
+import operator
+import os
+import sys
+import unittest
+from fractions import Fraction as BuiltinFraction
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib.interpreter import Fraction
+
+# Whole and fractional values, with negatives and zero
+VALUES = [BuiltinFraction(n, d) for n in range(-6, 7) for d in (1, 2, 3, 4)]
+
+
+class FractionArithmeticTests(unittest.TestCase):
+
+    def check(self, result, expected):
+        self.assertIs(type(result), Fraction)
+        self.assertEqual(result, expected)
+        self.assertEqual((result.numerator, result.denominator),
+                         (expected.numerator, expected.denominator))
+        self.assertEqual(hash(result), hash(expected))
+
+    def test_binary_operations(self):
+        for op in (operator.add, operator.sub, operator.mul):
+            for a, b in itertools.product(VALUES, repeat=2):
+                with self.subTest(op=op.__name__, a=a, b=b):
+                    self.check(op(Fraction(a), Fraction(b)), op(a, b))
+
+    def test_division(self):
+        for a, b in itertools.product(VALUES, repeat=2):
+            with self.subTest(a=a, b=b):
+                if b == 0:
+                    with self.assertRaises(ZeroDivisionError):
+                        Fraction(a) / Fraction(b)
+                else:
+                    self.check(Fraction(a) / Fraction(b), a / b)
+
+    def test_negation(self):
+        for a in VALUES:
+            with self.subTest(a=a):
+                self.check(-Fraction(a), -a)
+        self.assertEqual(str(-Fraction(0)), '0')
+
+    def test_other_operand_types(self):
+        # Only Fraction operands take the fast paths
+        self.assertEqual(Fraction(3) + 1, 4)
+        self.assertEqual(Fraction(1, 2) * 2.0, 1.0)
+        self.assertEqual(1 - Fraction(1, 3), BuiltinFraction(2, 3))
+        self.assertEqual(Fraction(3) / BuiltinFraction(3, 2), 2)
+
+
+class FractionConstructorTests(unittest.TestCase):
+
+    def check(self, fast, generic):
+        self.assertIs(type(fast), Fraction)
+        self.assertEqual(fast, generic)
+        self.assertEqual((fast.numerator, fast.denominator),
+                         (generic.numerator, generic.denominator))
+        self.assertEqual(hash(fast), hash(generic))
+        for other in (generic - 1, generic, generic + BuiltinFraction(1, 2)):
+            self.assertEqual(fast < other, generic < other)
+            self.assertEqual(fast == other, generic == other)
+
+    def test_from_int(self):
+        for n in (-(2 ** 70), -3, -1, 0, 1, 7, 2 ** 70):
+            with self.subTest(n=n):
+                # Passing a denominator takes the generic constructor
+                self.check(Fraction(n), Fraction(n, 1))
+
+    def test_from_builtin_fraction(self):
+        for value in VALUES:
+            with self.subTest(value=value):
+                self.check(Fraction(value),
+                           Fraction(value.numerator, value.denominator))
+
+    def test_generic_arguments(self):
+        self.assertEqual(Fraction('3/6'), BuiltinFraction(1, 2))
+        self.assertEqual(Fraction(6, -4), BuiltinFraction(-3, 2))
+        self.assertEqual(Fraction(0.5), BuiltinFraction(1, 2))
+        self.assertEqual(Fraction(True), 1)
+        self.assertIs(type(Fraction(True).numerator), int)
+
+
+if __name__ == '__main__':
+    unittest.main()
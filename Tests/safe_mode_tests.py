@@ -0,0 +1,140 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib import interpreter as I
+from lib.driver import parse_file
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+def run_source(source, argv=()):
+    with tempfile.NamedTemporaryFile('w', suffix='.rail',
+                                     delete=False) as f:
+        f.write(source)
+    try:
+        return run_file(f.name, argv)
+    finally:
+        os.remove(f.name)
+
+
+def run_file(filename, argv=()):
+    module = parse_file(filename)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        module.main(list(argv))
+    return out.getvalue()
+
+
+FOR_SOURCE = '''
+func main(argv)()
+    let a = [1, 2]
+    for (x in a)
+        x += 1
+    rof
+    println(a)
+    unlet a = [1, 2]
+return ()
+'''
+
+LOOP_SOURCE = '''
+func main(argv)()
+    let a = 0
+    loop (a < 3)
+        a += 1
+    pool (a > 1)
+    println(a)
+    unlet a = 3
+return ()
+'''
+
+IF_SOURCE = '''
+func main(argv)()
+    let a = 1
+    if (a == 1)
+        a += 1
+    fi (a == 1)
+    println(a)
+    unlet a = 2
+return ()
+'''
+
+LEAK_SOURCE = '''
+func main(argv)()
+    call f()
+    println("after")
+return ()
+
+func f()()
+    let x = 1
+return ()
+'''
+
+VALID_SOURCE = '''
+func main(argv)()
+    let total = 0
+    for (x in [1 to 5])
+        total += x
+    rof
+    let i = 0
+    loop (i < 4)
+        i += 1
+    pool (i > 0)
+    if (total > 5)
+        total -= 1
+    fi (total > 4)
+    println(total, i)
+    unlet i = 4
+    unlet total = 9
+return ()
+'''
+
+
+class SafeModeTests(unittest.TestCase):
+
+    def tearDown(self):
+        I.set_safe(True)
+
+    def test_for_assertion(self):
+        with self.assertRaises(I.RailwayValueError):
+            run_source(FOR_SOURCE)
+        # Unchecked, the modified loop variable is discarded
+        I.set_safe(False)
+        self.assertEqual(run_source(FOR_SOURCE), '[1, 2]\n')
+
+    def test_loop_assertion(self):
+        with self.assertRaises(I.RailwayFailedAssertion):
+            run_source(LOOP_SOURCE)
+        I.set_safe(False)
+        self.assertEqual(run_source(LOOP_SOURCE), '3\n')
+
+    def test_if_assertion(self):
+        with self.assertRaises(I.RailwayFailedAssertion):
+            run_source(IF_SOURCE)
+        I.set_safe(False)
+        self.assertEqual(run_source(IF_SOURCE), '2\n')
+
+    def test_leak_check(self):
+        # Leaks lose information, so they are reported either way
+        for safe in (True, False):
+            I.set_safe(safe)
+            with self.assertRaises(I.RailwayLeakedInformation):
+                run_source(LEAK_SOURCE)
+
+    def test_valid_programs_unchanged(self):
+        fibonaci = os.path.join(EXAMPLES, 'fibonaci.rail')
+        outputs = []
+        for safe in (True, False):
+            I.set_safe(safe)
+            outputs.append((run_source(VALID_SOURCE),
+                            run_file(fibonaci, [I.Fraction(12)])))
+        self.assertEqual(outputs[0][0], '9 4\n')
+        self.assertEqual(outputs[0], outputs[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,3 @@
-from collections import Counter
 from fractions import Fraction as BuiltinFraction
 from os.path import split as os_split
 
@@ -17,6 +16,18 @@ class RailwayDuplicateDefinition(RailwaySyntaxError): pass
 class RailwayNameConflict(RailwaySyntaxError): pass
 
 
+def _find_duplicate(names):
+    # Returns (name, count) for the most repeated name, or None if all are
+    # distinct. Counting is only done once a repeat has been found
+    seen = set()
+    for name in names:
+        if name in seen:
+            name = max(dict.fromkeys(names), key=names.count)
+            return name, names.count(name)
+        seen.add(name)
+    return None
+
+
 class Token:  # Delete me?
     __slots__ = ['type', 'string', 'line', 'col', 'first_set']
 
@@ -30,8 +41,13 @@ class Token:  # Delete me?
     def __repr__(self):
         return self.string
 
+    def compile(self):  # String items in print statements
+        return self.string
+
 
 class Fraction(BuiltinFraction):
+    __slots__ = []
+
     def compile(self):
         return interpreter.Fraction(self)
 
@@ -72,7 +88,7 @@ class Lookup:
         return self.name
 
     def compile(self):
-        index = tuple(idx.compile() for idx in self.index)
+        index = tuple([idx.compile() for idx in self.index])
         mononame = (self.name[0] == '.')
         hasmono = mononame or any(idx.hasmono for idx in index)
         if any(idx.uses_var(self.name) for idx in index):
@@ -92,7 +108,7 @@ class Parameter:
 
     def compile(self):
         mononame = (self.name[0] == '.')
-        return interpreter.Lookup(name=self.name, index=tuple(),
+        return interpreter.Lookup(name=self.name, index=(),
                                   mononame=mononame, hasmono=mononame)
 
 
@@ -130,7 +146,7 @@ class Binop:
         if (isinstance(lhs, interpreter.Fraction) and
                 isinstance(rhs, interpreter.Fraction)):
             return interpreter.Fraction(binop(lhs, rhs))
-        return interpreter.Binop(lhs, binop, rhs, name, hasmono=hasmono)
+        return interpreter.binop_nodes[name](lhs, rhs, name, hasmono=hasmono)
 
 
 class Uniop:
@@ -150,7 +166,8 @@ class Uniop:
         # Compile-time constant computation #
         if isinstance(expr, interpreter.Fraction):
             return interpreter.Fraction(uniop(expr))
-        return interpreter.Uniop(uniop, expr, name, hasmono=expr.hasmono)
+        node_class = interpreter.uniop_nodes[self.op.type]
+        return node_class(uniop, expr, name, hasmono=expr.hasmono)
 
 
 class ArrayLiteral:
@@ -163,11 +180,13 @@ class ArrayLiteral:
         return repr(self.items)
 
     def compile(self):
-        items = [i.compile() for i in self.items]
-        hasmono = any(i.hasmono for i in items)
-        unowned = all(isinstance(i, interpreter.Fraction) or
-                      (hasattr(i, 'unowned') and i.unowned)
-                      for i in items)
+        items, hasmono, unowned = [], False, True
+        for item in self.items:
+            item = item.compile()
+            items.append(item)
+            hasmono = hasmono or item.hasmono
+            unowned = unowned and (isinstance(item, interpreter.Fraction) or
+                                   getattr(item, 'unowned', False))
         return interpreter.ArrayLiteral(items, hasmono=hasmono, unowned=unowned)
 
 
@@ -234,7 +253,7 @@ class Let:
         if rhs.uses_var(self.name):
             raise RailwayCircularDefinition(f'Variable "{self.name}" is used '
                                             'during its own initialisation')
-        lhs = interpreter.Lookup(self.name, index=tuple(),
+        lhs = interpreter.Lookup(self.name, index=(),
                                  hasmono=mononame, mononame=mononame)
         return interpreter.Let(lhs, rhs, ismono=ismono, modreverse=modreverse)
 
@@ -262,7 +281,7 @@ class Unlet:
         if rhs.uses_var(self.name):
             raise RailwayCircularDefinition(f'Variable "{self.name}" is used '
                                             'during its own unlet')
-        lhs = interpreter.Lookup(self.name, index=tuple(),
+        lhs = interpreter.Lookup(self.name, index=(),
                                  hasmono=mononame, mononame=mononame)
         return interpreter.Unlet(
             lhs, rhs, ismono=ismono, modreverse=modreverse)
@@ -301,6 +320,10 @@ class Push:
         return f'push {self.src_lookup} => {self.dst_lookup}'
 
     def compile(self):
+        if self.src_lookup.index:
+            raise RailwayTypeError('Pushing an element of array '
+                                   f'"{self.src_lookup.name}" would cause '
+                                   'aliasing')
         src, dst = self.src_lookup.compile(), self.dst_lookup.compile()
         ismono = src.hasmono or dst.hasmono
         modreverse = (not src.mononame) or (not dst.mononame)
@@ -309,9 +332,6 @@ class Push:
                  any(i.uses_var(dst.name) for i in dst.index))):
             raise RailwaySelfmodification('Push statment modifies variable '
                                           f'"{dst.name}" using itself')
-        if src.index:
-            raise RailwayTypeError(f'Pushing an element of array "{src.name}" '
-                                   'would cause aliasing')
         if ((not src.mononame) and
                 (any(i.uses_var(src.name) for i in dst.index))):
             raise RailwaySelfmodification(
@@ -338,12 +358,13 @@ class Pop:
         return f'pop {self.src_lookup} => {self.dst_lookup}'
 
     def compile(self):
+        if self.dst_lookup.index:
+            raise RailwayTypeError(
+                f'Pop destination "{self.dst_lookup}" should be a name (not '
+                'have indices)')
         src, dst = self.src_lookup.compile(), self.dst_lookup.compile()
         ismono = src.hasmono or dst.hasmono
         modreverse = (not src.mononame) or (not dst.mononame)
-        if dst.index:
-            raise RailwayTypeError(
-                f'Pop destination "{dst}" should be a name (not have indices)')
         if any(i.uses_var(src.name) for i in src.index):
             raise RailwaySelfmodification('Pop statment modifies variable '
                                           f'"{src.name}" using itself')
@@ -379,16 +400,14 @@ class Swap:
             raise RailwaySelfmodification(
                 'Swap uses information from one side as an index on the other '
                 f'"{lhs} <=> {rhs}"')
-        if lhs.index:
-            *lhs_idx, lhs_tail = lhs.index
-            lhs.index = lhs_idx
-        else:
-            lhs_tail = None
-        if rhs.index:
-            *rhs_idx, rhs_tail = rhs.index
-            rhs.index = rhs_idx
-        else:
-            rhs_tail = None
+        # Each side is split into a lookup of the containing array and the
+        # final index into it, leaving the compiled lookups untouched
+        lhs_tail = lhs.index[-1] if lhs.index else None
+        rhs_tail = rhs.index[-1] if rhs.index else None
+        lhs = interpreter.Lookup(lhs.name, lhs.index[:-1], lhs.mononame,
+                                 hasmono=lhs.hasmono)
+        rhs = interpreter.Lookup(rhs.name, rhs.index[:-1], rhs.mononame,
+                                 hasmono=rhs.hasmono)
         return interpreter.Swap(lhs_lookup=lhs, rhs_lookup=rhs,
                                 lhs_idx=lhs_tail, rhs_idx=rhs_tail,
                                 ismono=ismono, modreverse=modreverse)
@@ -421,7 +440,8 @@ class If:
         if ismono and (exit_expr is not enter_expr):
             raise RailwaySyntaxError('Provided a reverse condition for a mono-'
                                      'directional if-statement')
-        modreverse = any(i.modreverse for i in lines + else_lines)
+        modreverse = (any(i.modreverse for i in lines) or
+                      any(i.modreverse for i in else_lines))
         if ismono and modreverse:
             raise RailwayIllegalMono(
                 'Using mono information in a branch condition which affects a '
@@ -571,10 +591,8 @@ class PrintLn:
         return f'println({", ".join(repr(i) for i in self.items)})'
 
     def compile(self):
-        items = [(i.string if isinstance(i, Token) else i.compile())
-                 for i in self.items]
-        ismono = any((not isinstance(i, str)) and i.hasmono
-                     for i in items)
+        items = [i.compile() for i in self.items]
+        ismono = any(type(i) is not str and i.hasmono for i in items)
         return interpreter.PrintLn(items, ismono=ismono, modreverse=False)
 
 
@@ -588,10 +606,8 @@ class Print:
         return f'print({", ".join(repr(i) for i in self.items)})'
 
     def compile(self):
-        items = [(i.string if isinstance(i, Token) else i.compile())
-                 for i in self.items]
-        ismono = any((not isinstance(i, str)) and i.hasmono
-                     for i in items)
+        items = [i.compile() for i in self.items]
+        ismono = any(type(i) is not str and i.hasmono for i in items)
         return interpreter.Print(items, ismono=ismono, modreverse=False)
 
 
@@ -613,7 +629,8 @@ class DoUndo:
         do_lines = [ln.compile() for ln in self.do_lines]
         yield_lines = ([] if self.yield_lines is None
                        else [ln.compile() for ln in self.yield_lines])
-        modreverse = any(i.modreverse for i in do_lines + yield_lines)
+        modreverse = (any(i.modreverse for i in do_lines) or
+                      any(i.modreverse for i in yield_lines))
         return interpreter.DoUndo(do_lines, yield_lines,
                                   ismono=False, modreverse=modreverse)
 
@@ -632,15 +649,15 @@ class Try:
                          ['yrt'])
 
     def compile(self):
-        iterator = self.iterator.compile()
-        lines = [ln.compile() for ln in self.lines]
         if self.name[0] == '.':
             raise RailwayIllegalMono(
                 f'Try statement assigns to mono name "{self.name}"')
+        iterator = self.iterator.compile()
+        lines = [ln.compile() for ln in self.lines]
         if iterator.hasmono:
             raise RailwayIllegalMono(f'Try statement has mono-directional '
                                      f'information in its iterator')
-        lookup = interpreter.Lookup(name=self.name, index=tuple(),
+        lookup = interpreter.Lookup(name=self.name, index=(),
                                     mononame=False, hasmono=False)
         return interpreter.Try(lookup=lookup, iterator=iterator, lines=lines,
                                ismono=False, modreverse=True)
@@ -677,16 +694,16 @@ class CallBlock:
         return out
 
     def compile(self):
+        duplicate = _find_duplicate([p.name for p in self.borrowed_params])
+        if duplicate is not None:
+            dup, count = duplicate
+            raise RailwayNameConflict(
+                f'{self.call.string} to function "{self.name}" borrows '
+                f'parameter "{dup}" {count} times')
         isuncall = self.call.string == 'uncall'
         borrowed_params = [p.compile() for p in self.borrowed_params]
         num_threads = (self.num_threads.compile()
                        if self.num_threads is not None else None)
-        param_counts = Counter(p.name for p in borrowed_params)
-        if len(param_counts) != len(borrowed_params):
-            dup, count = param_counts.most_common(1)[0]
-            raise RailwayNameConflict(
-                f'{self.call.string} to function "{self.name}" borrows '
-                f'parameter "{dup}" {count} times')
         return interpreter.CallBlock(
             isuncall, self.name, num_threads, borrowed_params)
 
@@ -739,12 +756,25 @@ class Function:
         return out
 
     def compile(self):
-        lines = [ln.compile() for ln in self.lines]
+        # The signature is checked before the body is compiled
         borrowed_params = [p.compile() for p in self.borrowed_params]
         in_params = ([p.compile() for p in self.in_params]
                      if self.in_params is not None else [])
         out_params = ([p.compile() for p in self.out_params]
                       if self.out_params is not None else [])
+        duplicate = _find_duplicate(
+            [p.name for p in borrowed_params + in_params])
+        if duplicate is not None:
+            dup, count = duplicate
+            raise RailwayNameConflict(
+                f'Parameter "{dup}" appears {count} times in the signature of '
+                f'function "{self.name}"')
+        duplicate = _find_duplicate([p.name for p in out_params])
+        if duplicate is not None:
+            dup, count = duplicate
+            raise RailwayNameConflict(f'Parameter "{dup}" is returned {count} '
+                                      f'times by function "{self.name}"')
+        lines = [ln.compile() for ln in self.lines]
         modreverse = any(ln.modreverse for ln in lines)
         if modreverse == (self.name[0] == '.'):
             if modreverse:
@@ -754,17 +784,6 @@ class Function:
                 raise RailwayExpectedMono(f'Function "{self.name}" modifies no '
                                           'non-mono variables, so should be '
                                           'marked as mono')
-        in_counts = Counter(p.name for p in borrowed_params + in_params)
-        out_counts = Counter(p.name for p in out_params)
-        if len(in_counts) != len(borrowed_params) + len(in_params):
-            dup, count = in_counts.most_common(1)[0]
-            raise RailwayNameConflict(
-                f'Parameter "{dup}" appears {count} times in the signature of '
-                f'function "{self.name}"')
-        if len(out_counts) != len(out_params):
-            dup, count = out_counts.most_common(1)[0]
-            raise RailwayNameConflict(f'Parameter "{dup}" is returned {count} '
-                                      f'times by function "{self.name}"')
         return interpreter.Function(
             self.name, lines, modreverse, borrowed_params, in_params, out_params
         )
@@ -792,7 +811,7 @@ class Global:
         if self.name[0] == '.':
             raise RailwayIllegalMono(
                 f'Global variable "{self.name}" cannot be mono')
-        lookup = interpreter.Lookup(name=self.name, index=tuple(),
+        lookup = interpreter.Lookup(name=self.name, index=(),
                                     mononame=False, hasmono=False)
         return interpreter.Global(lookup, expr)
 
@@ -833,7 +852,7 @@ class Module:
         extern_funcs = {}  # Temporary?
         funcs, global_lines = {}, []
         for item in items:
-            if isinstance(item, interpreter.Function):
+            if type(item) is interpreter.Function:
                 if item.name in extern_funcs or item.name in funcs:
                     raise RailwayDuplicateDefinition(
                         f'Function {item.name} has multiple definitions')
@@ -38,8 +38,7 @@ def parse_argv(args):
                          f'of type {flag[1:]}')
             fmt = flag_format_codes[flag]
             argv.append(
-                [Fraction(struct.unpack(fmt, data[j: j+step])[0])
-                 for j in range(0, len(data), step)]
+                [Fraction(value) for value, in struct.iter_unpack(fmt, data)]
             )
     return argv
 
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
-from copy import deepcopy
 from fractions import Fraction as BuiltinFraction
 import itertools
+import operator
 from threading import Thread, Lock, Event, BrokenBarrierError
 from threading import Barrier as pyBarrier
 
@@ -15,7 +15,7 @@ class RailwayException(RuntimeError):
         self.message = message
         self.stack = []
         while scope is not None:
-            name, tid = scope.name, int(scope.thread_num)
+            name, tid = scope.name, scope.thread_num
             if tid != -1:
                 name += f" (TID:{tid})"
             self.stack.append(name)
@@ -43,19 +43,44 @@ class RailwayMutexError(RailwayException): pass
 class RailwaySympatheticError(RailwayException): pass
 
 
+# -------------------- Run-time assertion control -------------------- #
+
+# The consistency assertions made by For, Loop and If can only fail if the
+# program itself is wrong, so they may be switched off for trusted programs.
+# The leak check at the end of a function is not affected, since a leaked
+# local would be lost along with the call's scope
+_SAFE = True
+
+
+def set_safe(safe):
+    global _SAFE
+    _SAFE = safe
+
+
 # -------------------- Interpreter-Only Objects ---------------------- #
 
+# Scopes of finished serial calls, kept for reuse by later calls. Only a few
+# are kept, so that deep recursion doesn't hold on to one scope per frame
+_scope_pool = []
+_SCOPE_POOL_SIZE = 32
+
+
 class Scope:
     __slots__ = ['parent', 'name', 'functions', 'locals',
                  'monos', 'globals', 'thread_num', 'thread_manager']
 
     def __init__(self, parent, name, functions, locals=None, monos=None,
                  globals=None, thread_num=None, thread_manager=None):
+        self.locals = locals if locals is not None else {}
+        self.monos = monos if monos is not None else {}
+        self._enter(parent, name, functions, globals, thread_num,
+                    thread_manager)
+
+    def _enter(self, parent, name, functions, globals=None, thread_num=None,
+               thread_manager=None):
         self.parent = parent
         self.name = name
         self.functions = functions
-        self.locals = locals if locals is not None else {}
-        self.monos = monos if monos is not None else {}
         self.globals = globals if globals is not None else {}
         self.thread_num = (thread_num if thread_num is not None
                            else parent.thread_num)
@@ -64,14 +89,21 @@ class Scope:
         else:
             self.thread_manager = thread_manager
 
+    # Variables are never None, so a single dict.get per table both tests
+    # for the name and fetches it
     def lookup(self, name, locals=True, globals=True, monos=True):
-        if monos and name in self.monos:
-            return self.monos[name]
-        if locals and name in self.locals:
-            return self.locals[name]
-        if globals and name in self.globals:
-            return self.globals[name]
+        if monos:
+            var = self.monos.get(name)
+            if var is not None:
+                return var
+        if locals:
+            var = self.locals.get(name)
+            if var is not None:
+                return var
         if globals:
+            var = self.globals.get(name)
+            if var is not None:
+                return var
             msg = f'Variable "{name}" is undefined'
         else:
             msg = f'Local variable "{name}" is undefined'
@@ -88,15 +120,30 @@ class Scope:
             self.locals[name] = var
 
     def remove(self, name):
-        if name in self.monos:
-            del self.monos[name]
-        elif name in self.locals:
-            del self.locals[name]
-        else:
+        if (self.monos.pop(name, None) is None
+                and self.locals.pop(name, None) is None):
             raise RailwayUndefinedVariable(
                 f'Local variable "{name}" does not exist',
                 scope=self)
 
+    def call_scope(self, name):
+        try:
+            scope = _scope_pool.pop()
+        except IndexError:
+            return Scope(parent=self, name=name, functions=self.functions,
+                         globals=self.globals)
+        scope._enter(self, name, self.functions, self.globals)
+        return scope
+
+    def release(self):
+        # Only for call scopes that nothing refers to any more
+        if len(_scope_pool) < _SCOPE_POOL_SIZE:
+            self.locals.clear()
+            self.monos.clear()
+            self.parent = self.functions = self.globals = None
+            self.thread_manager = None
+            _scope_pool.append(self)
+
     def lookup_func(self, name):
         if name not in self.functions:
             raise RailwayUndefinedFunction(f'Function "{name}" does not exist',
@@ -129,7 +176,10 @@ class Scope:
             return None, None, None
         my_turn, next_turn, mutex = self.thread_manager.get_mutex(
             name, backwards, self)
-        my_turn.wait()
+        # Checking the flag first skips the Event's internal lock whenever
+        # it is already this thread's turn
+        if not my_turn.is_set():
+            my_turn.wait()
         if self.thread_manager.panicked:
             raise RailwaySympatheticError(None)
         return my_turn, next_turn, mutex
@@ -156,6 +206,14 @@ class Variable:
         self.isarray = isarray
 
 
+def _copy_memory(memory):
+    # Memory is a Fraction or nested lists of Fractions, and Fractions are
+    # immutable, so only the lists need copying
+    if type(memory) is not list:
+        return memory
+    return [_copy_memory(x) if type(x) is list else x for x in memory]
+
+
 class ThreadManager:
     __slots__ = ['num_threads', 'barriers', 'mutexes', 'lock', 'panicked']
 
@@ -166,28 +224,35 @@ class ThreadManager:
         self.lock = Lock()
         self.panicked = False
 
+    # Barriers and mutexes are never removed once made, so an existing one
+    # can be read without the lock, which is only needed to create them
     def get_barrier(self, name):
-        self.lock.acquire()
-        if name not in self.barriers:
-            self.barriers[name] = pyBarrier(self.num_threads)
-        self.lock.release()
-        return self.barriers[name]
+        barrier = self.barriers.get(name)
+        if barrier is None:
+            with self.lock:
+                barrier = self.barriers.get(name)
+                if barrier is None:
+                    barrier = pyBarrier(self.num_threads)
+                    self.barriers[name] = barrier
+        return barrier
 
     def get_mutex(self, name, backwards, scope):
-        self.lock.acquire()
-        if name not in self.mutexes:
-            mutex = MutexInstance(
-                turns=[Event() for _ in range(self.num_threads)],
-                backwards=None)
-            self.mutexes[name] = mutex
-        else:
-            mutex = self.mutexes[name]
-        self.lock.release()
-        tid = int(scope.thread_num)
+        mutex = self.mutexes.get(name)
+        if mutex is None:
+            with self.lock:
+                mutex = self.mutexes.get(name)
+                if mutex is None:
+                    mutex = MutexInstance(
+                        turns=[Event() for _ in range(self.num_threads)],
+                        backwards=None)
+                    self.mutexes[name] = mutex
+        tid = scope.thread_num
         if mutex.backwards is None:
-            mutex.backwards = backwards
-            mutex.turns[-1 if backwards else 0].set()
-        elif backwards != mutex.backwards:
+            with self.lock:
+                if mutex.backwards is None:
+                    mutex.backwards = backwards
+                    mutex.turns[-1 if backwards else 0].set()
+        if backwards != mutex.backwards:
             bw = "backwards" if backwards else "forwards"
             raise RailwayMutexError(f'Thread {tid} entered mutex "{name}" '
                                     f'{bw}, counter flow', scope=scope)
@@ -212,6 +277,9 @@ class ThreadManager:
 
 class ExpressionNode(ABC):
     __slots__ = ["hasmono"]
+    # Array expressions that build a fresh value override this with a slot,
+    # everything else evaluates to memory that must be copied before reuse
+    unowned = False
 
     def __init__(self, hasmono):
         self.hasmono = hasmono  # Node or subnode uses a mono variable
@@ -247,9 +315,9 @@ class Module:
         argv = Variable(memory=argv, ismono=False,
                         isborrowed=False, isarray=True)
         scope = Scope(parent=None, name='main', functions=self.functions,
-                      locals={}, monos={}, globals={}, thread_num=Fraction(-1))
+                      locals={}, monos={}, globals={}, thread_num=-1)
         for line in self.global_lines:
-            line.eval(scope=scope)
+            line.eval(scope)
         scope.assign('argv', argv)
         main = self.functions.get('main', self.functions.get('.main', None))
         if main is None:
@@ -311,14 +379,14 @@ class Global:
         return out
 
     def eval(self, scope):
-        value = self.rhs.eval(scope=scope)
-        isarray = isinstance(value, list)
-        if isinstance(value, Fraction):
+        value = self.rhs.eval(scope)
+        isarray = type(value) is list
+        if not isarray:
             memory = [value]
-        elif hasattr(self.rhs, 'unowned') and self.rhs.unowned:
+        elif self.rhs.unowned:
             memory = value
         else:
-            memory = deepcopy(value)
+            memory = _copy_memory(value)
         var = Variable(memory=memory, ismono=False, isarray=isarray)
         scope.assign_global(name=self.lookup.name, var=var)
 
@@ -326,22 +394,27 @@ class Global:
 # ---------------- AST - Function bodies and calls ----------------#
 
 class Function:
-    __slots__ = ["name", "lines", "modreverse",
+    __slots__ = ["name", "lines", "reversed_lines", "modreverse",
                  "borrowed_params", "borrowed_names",
-                 "in_params", "in_names",
-                 "out_params", "out_names"]
+                 "in_params", "in_names", "num_in_locals",
+                 "out_params", "out_names", "num_out_locals"]
 
     def __init__(self, name, lines, modreverse, borrowed_params, in_params,
                  out_params):
         self.name = name
         self.lines = lines
+        self.reversed_lines = lines[::-1]
         self.modreverse = modreverse
         self.borrowed_params = borrowed_params
-        self.borrowed_names = set(p.name for p in borrowed_params)
+        self.borrowed_names = frozenset(p.name for p in borrowed_params)
         self.in_params = in_params
-        self.in_names = set(p.name for p in in_params + borrowed_params)
+        self.in_names = frozenset(p.name for p in in_params + borrowed_params)
         self.out_params = out_params
-        self.out_names = set(p.name for p in out_params + borrowed_params)
+        self.out_names = frozenset(p.name for p in out_params + borrowed_params)
+        # Non-mono names are held in scope.locals, so at the end of a
+        # (un)call the size of that dict can be compared against these
+        self.num_in_locals = sum(n[0] != '.' for n in self.in_names)
+        self.num_out_locals = sum(n[0] != '.' for n in self.out_names)
 
     def __repr__(self):
         out = f'func {self.name}('
@@ -353,36 +426,52 @@ class Function:
 
     def eval(self, scope, backwards):
         if backwards:
-            lines, out_names = reversed(self.lines), self.in_names
-            out_params = self.in_params
+            lines, out_names = self.reversed_lines, self.in_names
+            out_params, num_locals = self.in_params, self.num_in_locals
         else:
             lines, out_names = self.lines, self.out_names
-            out_params = self.out_params
+            out_params, num_locals = self.out_params, self.num_out_locals
         for line in lines:
-            line.eval(scope, backwards=backwards)
-        leaks = set(scope.locals).difference(out_names)
-        if leaks:
-            raise RailwayLeakedInformation(
-                f'Variable "{leaks.pop()}" is still in scope of '
-                f'function "{self.name}" at the end of a (un)call', scope=scope)
-        results = []
-        for param in out_params:
-            var = scope.lookup(param.name, globals=False)
-            results.append(var)
+            line.eval(scope, backwards)
+        locals, monos = scope.locals, scope.monos
+        if len(locals) > num_locals:
+            self._check_leaks(scope, out_names)
+        # As in Lookup, each output can only be in the table its name implies
+        results = [(monos if p.mononame else locals).get(p.name)
+                   for p in out_params]
+        if None in results:
+            try:
+                results = [scope.lookup(p.name, globals=False)
+                           for p in out_params]
+            except RailwayUndefinedVariable:
+                # With an output missing, a leak can hide behind an
+                # unchanged count
+                self._check_leaks(scope, out_names)
+                raise
+        for var, param in zip(results, out_params):
             if var.isborrowed:
                 raise RailwayReferenceOwnership(
                     f'Function "{self.name}" returns a borrowed reference to "'
                     f'{param.name}"', scope=scope)
         return results
 
+    def _check_leaks(self, scope, out_names):
+        for name in scope.locals:
+            if name not in out_names:
+                raise RailwayLeakedInformation(
+                    f'Variable "{name}" is still in scope of '
+                    f'function "{self.name}" at the end of a (un)call',
+                    scope=scope)
+
 
 class CallChain(StatementNode):
-    __slots__ = ["in_params", "calls", "out_params"]
+    __slots__ = ["in_params", "calls", "reversed_calls", "out_params"]
 
     def __init__(self, in_params, calls, out_params, **kwargs):
         super().__init__(**kwargs)
         self.in_params = in_params
         self.calls = calls
+        self.reversed_calls = calls[::-1]
         self.out_params = out_params
 
     def __repr__(self):
@@ -406,7 +495,7 @@ class CallChain(StatementNode):
                     f'not be stolen by function "{self.calls[0].name}"',
                     scope=scope)
             scope.remove(p.name)
-        for call in reversed(self.calls) if backwards else self.calls:
+        for call in self.reversed_calls if backwards else self.calls:
             eval_method = (_eval_call if call.num_threads is None else
                            _eval_call_parallel)
             variables = eval_method(call, backwards, variables, scope)
@@ -416,20 +505,18 @@ class CallChain(StatementNode):
                 f'Function "{call.name}" returned {len(variables)} variables '
                 f'but the result is assigned to {len(params)} variables', scope)
         for var, param in zip(variables, params):
-            _check_mono_match(
-                var, param, call.isuncall ^ backwards, call.name, scope)
+            if var.ismono != param.mononame:
+                _raise_mono_mismatch(
+                    var, param, call.isuncall ^ backwards, call.name, scope)
             scope.assign(param.name, var)
         return backwards
 
 
 def _eval_call(call, backwards, variables, scope):
-    function = scope.lookup_func(call.name)
+    function = call.lookup_func(scope)
     uncall = call.isuncall ^ backwards
     params = function.out_params if uncall else function.in_params
-    subscope = Scope(parent=scope,
-                     name=call.name,
-                     functions=scope.functions,
-                     locals={}, monos={}, globals=scope.globals)
+    subscope = scope.call_scope(call.name)
     if len(variables) != len(params):
         raise RailwayCallError(
             f'{"Unc" if uncall else "C"}alling function "{call.name}" with '
@@ -441,20 +528,23 @@ def _eval_call(call, backwards, variables, scope):
             f'{len(call.borrowed_params)} borrowed references when it expects '
             f'{len(function.borrowed_params)}', scope=scope)
     for var, param in zip(variables, params):
-        _check_mono_match(var, param, uncall, call.name, scope)
+        if var.ismono != param.mononame:
+            _raise_mono_mismatch(var, param, uncall, call.name, scope)
         subscope.assign(param.name, var)
-    for call_param, func_param in zip(call.borrowed_params,
-                                      function.borrowed_params):
-        var = scope.lookup(call_param.name)
-        _check_mono_match(var, func_param, uncall, call.name, scope)
+    for call_name, func_param in call.borrowed_pairs:
+        var = scope.lookup(call_name)
+        if var.ismono != func_param.mononame:
+            _raise_mono_mismatch(var, func_param, uncall, call.name, scope)
         new_var = Variable(memory=var.memory, ismono=var.ismono,
                            isborrowed=True, isarray=var.isarray)
         subscope.assign(func_param.name, new_var)
-    return function.eval(scope=subscope, backwards=uncall)
+    results = function.eval(subscope, uncall)
+    subscope.release()
+    return results
 
 
 def _eval_call_parallel(call, backwards, variables, scope):
-    function = scope.lookup_func(call.name)
+    function = call.lookup_func(scope)
     uncall = call.isuncall ^ backwards
     params = function.out_params if uncall else function.in_params
     num_threads = _get_num_threads(call, scope)
@@ -472,25 +562,32 @@ def _eval_call_parallel(call, backwards, variables, scope):
                          name=call.name,
                          functions=scope.functions,
                          globals=scope.globals,
-                         thread_num=Fraction(t_num),
+                         thread_num=t_num,
                          thread_manager=thread_manager)
         for var, param in zip(split_vars[t_num], params):
-            _check_mono_match(var, param, uncall, call.name, scope)
+            if var.ismono != param.mononame:
+                _raise_mono_mismatch(var, param, uncall, call.name, scope)
             subscope.assign(param.name, var)
-        for call_param, func_param in zip(call.borrowed_params,
-                                          function.borrowed_params):
-            var = scope.lookup(call_param.name)
-            _check_mono_match(var, func_param, uncall, call.name, scope)
+        for call_name, func_param in call.borrowed_pairs:
+            var = scope.lookup(call_name)
+            if var.ismono != func_param.mononame:
+                _raise_mono_mismatch(
+                    var, func_param, uncall, call.name, scope)
             new_var = Variable(memory=var.memory, ismono=var.ismono,
                                isborrowed=True, isarray=var.isarray)
             subscope.assign(func_param.name, new_var)
         subscopes.append(subscope)
+        if t_num == 0:
+            continue
         thread = Thread(target=_thread_worker,
                         args=(function, subscope, uncall, results, t_num))
         thread.start()
         threads.append(thread)
-    for thread, result in zip(threads, results):
+    # The calling thread would otherwise sit idle in join, so it runs thread 0
+    _thread_worker(function, subscopes[0], uncall, results, 0)
+    for thread in threads:
         thread.join()
+    for result in results:
         if (isinstance(result, Exception)
                 and not isinstance(result, RailwaySympatheticError)):
             raise result
@@ -502,7 +599,7 @@ def _eval_call_parallel(call, backwards, variables, scope):
 
 def _thread_worker(function, scope, backwards, results, t_num):
     try:
-        results[t_num] = function.eval(scope=scope, backwards=backwards)
+        results[t_num] = function.eval(scope, backwards)
     except Exception as e:
         results[t_num] = e
         scope.thread_manager.panic()
@@ -521,22 +618,21 @@ def _split_variables(variables, params, num_threads, isuncall, call, scope):
                 'meaning all stolen references should be arrays of length '
                 f'{num_threads}. Input {i+1} is length {len(var.memory)}',
                 scope=scope)
-    output = []
-    for i in range(num_threads):
-        row = []
-        for var in variables:
-            value = var.memory[i]
-            isarray = isinstance(value, list)
-            memory = value if isarray else [value]
-            row.append(Variable(memory=memory, ismono=var.ismono,
-                                isborrowed=False, isarray=isarray))
-        output.append(row)
+    # Walk each stolen array once, dealing its elements out to the threads
+    output = [[] for _ in range(num_threads)]
+    for var in variables:
+        ismono = var.ismono
+        for row, value in zip(output, var.memory):
+            isarray = type(value) is list
+            row.append(Variable(memory=value if isarray else [value],
+                                ismono=ismono, isborrowed=False,
+                                isarray=isarray))
     return output
 
 
 def _get_num_threads(call, scope):
-    num_threads = call.num_threads.eval(scope=scope)
-    if isinstance(num_threads, list):
+    num_threads = call.num_threads.eval(scope)
+    if type(num_threads) is list:
         raise RailwayTypeError('Got an array in place of numthreads for call '
                                f'to "{call.name}"', scope=scope)
     num_threads = int(num_threads)
@@ -546,27 +642,31 @@ def _get_num_threads(call, scope):
     return num_threads
 
 
-def _check_mono_match(variable, parameter, isuncall, fname, scope):
-    if variable.ismono and not parameter.mononame:
-        callstr = 'Uncalling' if isuncall else 'Calling'
+# Callers compare variable.ismono against parameter.mononame themselves and
+# only come here to build the error once they differ
+def _raise_mono_mismatch(variable, parameter, isuncall, fname, scope):
+    callstr = 'Uncalling' if isuncall else 'Calling'
+    if variable.ismono:
         raise RailwayIllegalMono(
             f'{callstr} function "{fname}" using mono argument for non-mono'
             f' parameter "{parameter.name}"', scope=scope)
-    if parameter.mononame and not variable.ismono:
-        callstr = 'Uncalling' if isuncall else 'Calling'
-        raise RailwayIllegalMono(
-            f'{callstr} function "{fname}" using non-mono argument for '
-            f'mono parameter "{parameter.name}"', scope=scope)
+    raise RailwayIllegalMono(
+        f'{callstr} function "{fname}" using non-mono argument for '
+        f'mono parameter "{parameter.name}"', scope=scope)
 
 
 class CallBlock:
-    __slots__ = ["isuncall", "name", "num_threads", "borrowed_params"]
+    __slots__ = ["isuncall", "name", "num_threads", "borrowed_params",
+                 "function", "functions", "borrowed_pairs"]
 
     def __init__(self, isuncall, name, num_threads, borrowed_params):
         self.isuncall = isuncall
         self.name = name
         self.num_threads = num_threads
         self.borrowed_params = borrowed_params
+        self.function = None
+        self.functions = None
+        self.borrowed_pairs = None
 
     def __repr__(self):
         out = ('uncall' if self.isuncall else 'call') + ' ' + self.name
@@ -575,17 +675,32 @@ class CallBlock:
         out += f'({", ".join(repr(p) for p in self.borrowed_params)})'
         return out
 
+    def lookup_func(self, scope):
+        # The function table is complete before anything is called, so the
+        # resolved function is kept until the call runs against another table
+        if self.functions is not scope.functions:
+            function = scope.lookup_func(self.name)
+            self.borrowed_pairs = [
+                (call_param.name, func_param) for call_param, func_param
+                in zip(self.borrowed_params, function.borrowed_params)]
+            self.function = function
+            self.functions = scope.functions
+        return self.function
+
 
 # -------------------- Try-Catch --------------------#
 
 class Try(StatementNode):
-    __slots__ = ["lookup", "iterator", "lines"]
+    __slots__ = ["lookup", "iterator", "lines", "islazy", "checktype"]
 
     def __init__(self, lookup, iterator, lines, **kwargs):
         super().__init__(**kwargs)
         self.lookup = lookup
         self.iterator = iterator
         self.lines = lines
+        self.islazy = hasattr(iterator, 'lazy_eval')
+        # Array literals and tensors can only ever produce arrays
+        self.checktype = not isinstance(iterator, (ArrayLiteral, ArrayTensor))
 
     def __repr__(self):
         return '\n'.join([f'try ({self.lookup} in {self.iterator})'] +
@@ -593,11 +708,11 @@ class Try(StatementNode):
                          ['yrt'])
 
     def eval(self, scope, backwards):
-        if hasattr(self.iterator, 'lazy_eval'):
+        if self.islazy:
             memory = self.iterator.lazy_eval(scope, backwards)
         else:
             memory = self.iterator.eval(scope)
-            if isinstance(memory, Fraction):
+            if self.checktype and type(memory) is not list:
                 raise RailwayTypeError('The iterator provided to Try must be an'
                                        f' array, recieved a number', scope)
         if backwards:
@@ -610,7 +725,7 @@ class Try(StatementNode):
         i = 0
         while i < len(memory):
             value = memory[i]
-            if isinstance(value, Fraction):
+            if type(value) is not list:
                 var = Variable(memory=[value], ismono=False, isborrowed=False,
                                isarray=False)
             else:
@@ -654,16 +769,29 @@ class Catch(StatementNode):
 
 
 def _run_lines(lines, scope, backwards):
-    i = len(lines) - 1 if backwards else 0
-    while 0 <= i < len(lines):
-        new_backwards = lines[i].eval(scope, backwards)
-        if (new_backwards != backwards) and scope.monos:
+    # Statements run as a plain for loop over the block, or over what is left
+    # of it, in the current direction. That loop is only left when a statement
+    # reverses time, and then restarts from that statement's neighbour
+    start = len(lines) - 1 if backwards else 0
+    sequence = reversed(lines) if backwards else lines
+    while True:
+        for i, line in enumerate(sequence):
+            new_backwards = line.eval(scope, backwards)
+            if new_backwards != backwards:
+                break
+        else:
+            return backwards
+        if scope.monos:
             name = scope.monos.popitem()[0]
             raise RailwayDirectionChange('Direction of time changes with mono '
                                          f'variable "{name}" in scope', scope)
         backwards = new_backwards
-        i = i-1 if backwards else i+1
-    return backwards
+        if backwards:
+            start += i - 1
+            sequence = reversed(lines[:start + 1])
+        else:
+            start -= i - 1
+            sequence = lines[start:]
 
 
 # -------------------- AST - Print --------------------#
@@ -707,10 +835,40 @@ class PrintLn(StatementNode):
 
 
 def _stringify(memory):
-    # Temporary implementation
-    if isinstance(memory, Fraction):
-        return str(memory)
-    return '[' + ', '.join(_stringify(elt) for elt in memory) + ']'
+    # Walks nested arrays with an explicit stack of pending items and
+    # separators, writing everything into a single output buffer. An array
+    # whose elements are all numbers or arrays of numbers, the usual bottom
+    # two levels, is written in one go without going through the stack
+    if type(memory) is not list:
+        return Fraction.__str__(memory)
+    out, stack = [], [memory]
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            out.append(item)
+            continue
+        if type(item) is not list:
+            out.append(Fraction.__str__(item))
+            continue
+        parts = []
+        for element in item:
+            if type(element) is not list:
+                parts.append(Fraction.__str__(element))
+            elif list not in map(type, element):
+                parts.append(
+                    '[' + ', '.join(map(Fraction.__str__, element)) + ']')
+            else:
+                break
+        else:
+            out.append('[' + ', '.join(parts) + ']')
+            continue
+        out.append('[')
+        stack.append(']')
+        for i in range(len(item) - 1, -1, -1):
+            stack.append(item[i])
+            if i:
+                stack.append(', ')
+    return ''.join(out)
 
 
 # -------------------- AST - Barrier, Mutex --------------------#
@@ -808,13 +966,16 @@ class DoUndo(StatementNode):
 # -------------------- AST - For --------------------#
 
 class For(StatementNode):
-    __slots__ = ["lookup", "iterator", "lines"]
+    __slots__ = ["lookup", "iterator", "lines", "islazy", "checktype"]
 
     def __init__(self, lookup, iterator, lines, **kwargs):
         super().__init__(**kwargs)
         self.lookup = lookup
         self.iterator = iterator
         self.lines = lines
+        self.islazy = hasattr(iterator, 'lazy_eval')
+        # Array literals and tensors can only ever produce arrays
+        self.checktype = not isinstance(iterator, (ArrayLiteral, ArrayTensor))
 
     def __repr__(self):
         return '\n'.join([f'for ({self.lookup} in {self.iterator})'] +
@@ -822,35 +983,46 @@ class For(StatementNode):
                          ['rof'])
 
     def eval(self, scope, backwards):
-        if hasattr(self.iterator, 'lazy_eval'):
+        if self.islazy:
             memory = self.iterator.lazy_eval(scope, backwards)
         else:
             memory = self.iterator.eval(scope)
-            if isinstance(memory, Fraction):
+            if self.checktype and type(memory) is not list:
                 raise RailwayTypeError('For loop must iterate over array, '
                                        f'recieved number {memory}', scope=scope)
-        name = self.lookup.name
+        name, mononame = self.lookup.name, self.lookup.mononame
+        lines, assign, remove = self.lines, scope.assign, scope.remove
+        islazy = self.islazy
+        # The loop variable is borrowed, so it cannot be stolen or outlive
+        # its iteration, and one Variable can be refilled for each element
+        var = Variable(memory=None, ismono=mononame, isborrowed=True)
         i = len(memory) - 1 if backwards else 0
         while 0 <= i < len(memory):
-            element = deepcopy(memory[i])
-            isarray = isinstance(element, list)
-            if not isarray:
-                element = [element]
-            var = Variable(memory=element, ismono=self.lookup.mononame,
-                           isborrowed=True, isarray=isarray)
-            scope.assign(name, var)
-            backwards = _run_lines(self.lines, scope, backwards)
-            if isarray and var.memory != memory[i]:
-                raise RailwayValueError(
-                    f'For loop variable "{name}" has a different value to the '
-                    'corresponding iterator element after the code block has '
-                    'run', scope=scope)
-            if (not isarray) and var.memory[0] != memory[i]:
-                raise RailwayValueError(
-                    f'For loop variable "{name}" has value {var.memory[0]} '
-                    f'after an iteration, but the iterator array has '
-                    f'corresponding value {memory[i]}', scope=scope)
-            scope.remove(name)
+            value = memory[i]
+            isarray = type(value) is list
+            var.memory = _copy_memory(value) if isarray else [value]
+            var.isarray = isarray
+            assign(name, var)
+            backwards = _run_lines(lines, scope, backwards)
+            # A range cannot be changed by the body, so its element need not
+            # be rebuilt for the comparison. Unchanged elements still share
+            # their Fractions with the iterator, so identity settles most
+            if not islazy:
+                value = memory[i]
+            if _SAFE and isarray:
+                if var.memory != value:
+                    raise RailwayValueError(
+                        f'For loop variable "{name}" has a different value to '
+                        'the corresponding iterator element after the code '
+                        'block has run', scope=scope)
+            elif _SAFE and var.memory[0] is not value:
+                if var.memory[0] != value:
+                    raise RailwayValueError(
+                        f'For loop variable "{name}" has value '
+                        f'{var.memory[0]} after an iteration, but the iterator'
+                        f' array has corresponding value {value}',
+                        scope=scope)
+            remove(name)
             i += -1 if backwards else 1
         return backwards
 
@@ -858,13 +1030,21 @@ class For(StatementNode):
 # -------------------- AST - Loop, If --------------------#
 
 class Loop(StatementNode):
-    __slots__ = ["forward_condition", "lines", "backward_condition"]
+    __slots__ = ["forward_condition", "lines", "backward_condition",
+                 "directions"]
 
     def __init__(self, forward_condition, lines, backward_condition, **kwargs):
         super().__init__(**kwargs)
         self.forward_condition = forward_condition
         self.lines = lines
         self.backward_condition = backward_condition
+        # The (condition, assertion) pair for each direction, indexed by the
+        # backwards flag, so a direction change in the body is a tuple index
+        forward_eval = forward_condition.eval
+        backward_eval = (None if backward_condition is None
+                         else backward_condition.eval)
+        self.directions = ((forward_eval, backward_eval),
+                           (backward_eval, forward_eval))
 
     def __repr__(self):
         return '\n'.join([f'loop ({self.forward_condition})'] +
@@ -874,25 +1054,17 @@ class Loop(StatementNode):
     def eval(self, scope, backwards):
         if backwards and not self.modreverse:
             return True
-        if backwards:
-            condition = self.backward_condition
-            assertion = self.forward_condition
-        else:
-            condition = self.forward_condition
-            assertion = self.backward_condition
-        if not self.ismono and assertion.eval(scope):
+        lines, directions = self.lines, self.directions
+        check = _SAFE and not self.ismono
+        condition, assertion = directions[backwards]
+        if check and assertion(scope):
             raise RailwayFailedAssertion(
                 'Loop reverse condition is true before loop start',
                 scope=scope)
-        while condition.eval(scope):
-            backwards = _run_lines(self.lines, scope, backwards)
-            if backwards:
-                condition = self.backward_condition
-                assertion = self.forward_condition
-            else:
-                condition = self.forward_condition
-                assertion = self.backward_condition
-            if (not self.ismono) and (not assertion.eval(scope)):
+        while condition(scope):
+            backwards = _run_lines(lines, scope, backwards)
+            condition, assertion = directions[backwards]
+            if check and not assertion(scope):
                 raise RailwayFailedAssertion('Foward loop condition holds when'
                                              ' reverse condition does not',
                                              scope=scope)
@@ -924,7 +1096,7 @@ class If(StatementNode):
         lines = self.lines if enter_result else self.else_lines
         backwards = _run_lines(lines, scope, backwards)
         exit_expr = self.enter_expr if backwards else self.exit_expr
-        if not self.ismono:
+        if _SAFE and not self.ismono:
             exit_result = bool(exit_expr.eval(scope))
             if exit_result != enter_result:
                 raise RailwayFailedAssertion(
@@ -956,15 +1128,13 @@ class Push(StatementNode):
 
 
 def push_eval(scope, src_lookup, dst_lookup):
-    dst_var = scope.lookup(dst_lookup.name)
-    src_var = scope.lookup(src_lookup.name)
-    dst_mem = dst_lookup.eval(scope)
-    src_mem = src_lookup.eval(scope)
+    dst_var, dst_mem = dst_lookup.eval_with_var(scope)
+    src_var, src_mem = src_lookup.eval_with_var(scope)
     if not dst_var.isarray:
         raise RailwayTypeError(f'PUSHing onto "{dst_lookup.name}" '
                                'which is a number, not an array',
                                scope=scope)
-    if not isinstance(dst_mem, list):
+    if type(dst_mem) is not list:
         raise RailwayTypeError(
             f'Pushing onto a loction in "{dst_lookup.name}" which is '
             'a number, not an array',
@@ -998,9 +1168,7 @@ class Pop(StatementNode):
 
 
 def pop_eval(scope, src_lookup, dst_lookup):
-    # Opporunity for optimisation: the var.eval duplicates the scope.lookup
-    src_var = scope.lookup(src_lookup.name)
-    src_mem = src_lookup.eval(scope)
+    src_var, src_mem = src_lookup.eval_with_var(scope)
     if not src_var.isarray:
         raise RailwayTypeError(
             f'Trying to pop from "{src_lookup.name}" which is a '
@@ -1013,7 +1181,7 @@ def pop_eval(scope, src_lookup, dst_lookup):
             f'Popping from empty array "{src_lookup.name}" (or an '
             'element therein)',
             scope=scope)
-    isarray = isinstance(contents, list)
+    isarray = type(contents) is list
     var = Variable(memory=contents if isarray else [contents],
                    ismono=dst_lookup.mononame,
                    isarray=isarray)
@@ -1038,40 +1206,44 @@ class Swap(StatementNode):
 
     def eval(self, scope, backwards):
         if self.lhs_idx is None:
-            lhs_mem = scope.lookup(self.lhs_lookup.name).memory
+            lhs_mem = self.lhs_lookup.find_var(scope).memory
             lhs_index = 0
         else:
-            lhs_mem = self.lhs_lookup.eval(scope=scope)
-            lhs_index = self.lhs_idx.eval(scope=scope)
-            if isinstance(lhs_mem, Fraction):
+            lhs_mem = self.lhs_lookup.eval(scope)
+            lhs_index = self.lhs_idx.eval(scope)
+            if type(lhs_mem) is not list:
                 raise RailwayTypeError(
                     f'Indexing into Fraction in "{self.lhs_lookup.name}[?]" '
                     f'during swap with "{self.rhs_lookup.name}"', scope=scope)
         if self.rhs_idx is None:
-            rhs_mem = scope.lookup(self.rhs_lookup.name).memory
+            rhs_mem = self.rhs_lookup.find_var(scope).memory
             rhs_index = 0
         else:
-            rhs_mem = self.rhs_lookup.eval(scope=scope)
-            rhs_index = self.rhs_idx.eval(scope=scope)
-            if isinstance(rhs_mem, Fraction):
+            rhs_mem = self.rhs_lookup.eval(scope)
+            rhs_index = self.rhs_idx.eval(scope)
+            if type(rhs_mem) is not list:
                 raise RailwayTypeError(
                     f'Indexing into Fraction in "{self.rhs_lookup.name}[?]" '
                     f'during swap with "{self.lhs_lookup.name}"', scope=scope)
-        if isinstance(lhs_index, list) or isinstance(rhs_index, list):
+        if type(lhs_index) is list or type(rhs_index) is list:
             raise RailwayTypeError(
                 f'Using array as index during swap of "{self.lhs_lookup.name}" '
                 f'and "{self.rhs_lookup.name}"', scope=scope)
         lhs_index, rhs_index = int(lhs_index), int(rhs_index)
-        if lhs_index < -len(lhs_mem) or lhs_index >= len(lhs_mem):
+        # Bounds are checked by the list accesses themselves. Both cells are
+        # read before either is written, so a failed swap changes nothing
+        try:
+            tmp = lhs_mem[lhs_index]
+        except IndexError:
             raise RailwayIndexError('Out of bounds access '
                                     f'"{self.lhs_lookup.name}[?][{lhs_index}]"',
                                     scope=scope)
-        if rhs_index < -len(rhs_mem) or rhs_index >= len(rhs_mem):
+        try:
+            lhs_mem[lhs_index] = rhs_mem[rhs_index]
+        except IndexError:
             raise RailwayIndexError('Out of bounds access '
                                     f'"{self.rhs_lookup.name}[?][{rhs_index}]"',
                                     scope=scope)
-        tmp = lhs_mem[lhs_index]
-        lhs_mem[lhs_index] = rhs_mem[rhs_index]
         rhs_mem[rhs_index] = tmp
         return backwards
 
@@ -1110,7 +1282,7 @@ class Promote(StatementNode):
 # -------------------- AST - Modifications --------------------#
 
 class Modop(StatementNode):
-    __slots__ = ["lookup", "op", "inv_op", "expr", "name"]
+    __slots__ = ["lookup", "op", "inv_op", "expr", "name", "constant"]
 
     def __init__(self, lookup, op, inv_op, expr, name="UNNAMED", **kwargs):
         super().__init__(**kwargs)
@@ -1119,6 +1291,8 @@ class Modop(StatementNode):
         self.inv_op = inv_op
         self.expr = expr
         self.name = name
+        # A literal right hand side, as in 'x += 1', is used without an eval
+        self.constant = expr if type(expr) is Fraction else None
 
     def __repr__(self):
         return f'{self.lookup} {self.name} {self.expr}'
@@ -1127,19 +1301,29 @@ class Modop(StatementNode):
         if backwards and self.ismono:
             return backwards
         op = self.inv_op if backwards else self.op
-        lhs, rhs = self.lookup.eval(scope), self.expr.eval(scope)
-        if isinstance(lhs, list) or isinstance(rhs, list):
+        lookup = self.lookup
+        if lookup.index:
+            memory, index = lookup.locate(scope)
+            lhs = memory[index]
+        else:
+            var = lookup.find_var(scope)
+            memory, index = var.memory, 0
+            lhs = memory if var.isarray else memory[0]
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.expr.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
             raise RailwayValueError(f'Modification operation "{self.name}" does'
                                     ' not support arrays', scope=scope)
         try:
-            result = Fraction(op(lhs, rhs))
+            result = op(lhs, rhs)
         except ZeroDivisionError:
             raise RailwayZeroError(
                 ('Multiplying' if self.name == 'MODMUL' else 'Dividing') +
-                f' variable "{self.lookup.name}" by 0', scope=scope)
-        self.lookup.set(scope, result)
-        # The seperate lookup.eval and lookup.set calls are
-        # an opportunity for optimisation
+                f' variable "{lookup.name}" by 0', scope=scope)
+        if type(result) is not Fraction:
+            result = Fraction(result)
+        memory[index] = result
         return backwards
 
 
@@ -1189,33 +1373,43 @@ class Unlet(StatementNode):
 
 def let_eval(self, scope):
     lhs, rhs = self.lookup, self.rhs
-    value = rhs.eval(scope=scope)
-    isarray = isinstance(value, list)
-    if isinstance(value, Fraction):
-        memory = [value]
-    elif hasattr(rhs, 'unowned') and rhs.unowned:
-        memory = value
+    value = rhs.eval(scope)
+    if type(value) is not list:
+        var = Variable(memory=[value], ismono=lhs.mononame, isarray=False)
     else:
-        memory = deepcopy(value)
-    var = Variable(memory=memory, ismono=lhs.mononame, isarray=isarray)
-    scope.assign(name=lhs.name, var=var)
+        memory = value if rhs.unowned else _copy_memory(value)
+        var = Variable(memory=memory, ismono=lhs.mononame, isarray=True)
+    scope.assign(lhs.name, var)
 
 
 def unlet_eval(self, scope):
     lhs, rhs = self.lookup, self.rhs
-    var = scope.lookup(name=lhs.name, globals=False)
+    var = scope.lookup(lhs.name, globals=False)
     if var.isborrowed:
         raise RailwayReferenceOwnership(
             f'Unletting borrowed reference "{lhs.name}"', scope=scope)
     if not self.ismono:
-        value = rhs.eval(scope=scope)
-        if var.isarray != isinstance(value, list):
+        # A tensor is checked against its shape and fill without being built
+        istensor = type(rhs) is ArrayTensor
+        if istensor:
+            dims, fill = rhs.eval_shape(scope)
+            isarray = True
+        else:
+            value = rhs.eval(scope)
+            isarray = type(value) is list
+        if var.isarray != isarray:
             t = ["number", "array"]
             raise RailwayTypeError(f'Trying to unlet {t[var.isarray]} '
                                    f'"{lhs.name}" using {t[not var.isarray]}',
                                    scope=scope)
-        memory = value if isinstance(value, list) else [value]
-        if var.memory != memory:
+        # Numbers are compared in place rather than wrapped in a list first
+        if istensor:
+            mismatch = not ArrayTensor.tensor_matches(var.memory, dims, fill)
+        elif isarray:
+            mismatch = var.memory != value
+        else:
+            mismatch = var.memory[0] != value
+        if mismatch:
             raise RailwayValueError(f'Variable "{lhs.name}" does not match '
                                     'RHS during uninitialisation', scope=scope)
     scope.remove(lhs.name)
@@ -1260,17 +1454,25 @@ class ArrayRange(ExpressionNode):
         by_str = '' if self.step is None else f' by {self.step}'
         return f'[{self.start} to {self.stop}{by_str}]'
 
-    def eval(self, scope):
-        val = self.start.eval(scope=scope)
-        step = self.step.eval(scope=scope)
-        stop = self.stop.eval(scope=scope)
-        if (isinstance(val, list) or isinstance(step, list) or
-                isinstance(stop, list)):
+    def _eval_bounds(self, scope):
+        start = self.start.eval(scope)
+        step = self.step.eval(scope)
+        stop = self.stop.eval(scope)
+        if (type(start) is list or type(step) is list or
+                type(stop) is list):
             raise RailwayValueError('An argument to an array range was a list',
                                     scope=scope)
         if step == 0:
             raise RailwayValueError(
                 f'Step value for array range must be non-zero', scope=scope)
+        isinteger = (start.denominator == 1 and step.denominator == 1
+                     and stop.denominator == 1)
+        return start, step, stop, isinteger
+
+    def eval(self, scope):
+        val, step, stop, isinteger = self._eval_bounds(scope)
+        if isinteger:
+            return [Fraction(x) for x in range(int(val), int(stop), int(step))]
         out = []
         if step > 0:
             while val < stop:
@@ -1283,24 +1485,19 @@ class ArrayRange(ExpressionNode):
         return out
 
     def lazy_eval(self, scope, backwards):
-        start = self.start.eval(scope=scope)
-        step = self.step.eval(scope=scope)
-        stop = self.stop.eval(scope=scope)
-        if (isinstance(start, list) or isinstance(step, list) or
-                isinstance(stop, list)):
-            raise RailwayValueError('An argument to an array range was a list',
-                                    scope=scope)
-        if step == 0:
-            raise RailwayValueError(
-                f'Step value for array range must be non-zero', scope=scope)
+        start, step, stop, isinteger = self._eval_bounds(scope)
         if step > 0:
             length = max(0, (stop - start + step - 1) // step)
         else:
             length = max(0, (stop - start + step + 1) // step)
+        if isinteger:
+            start, step = int(start), int(step)
         return _LazyRange(start, step, length)
 
 
 class _LazyRange:
+    __slots__ = ['start', 'step', 'length']
+
     def __init__(self, start, step, length):
         self.start = start
         self.step = step
@@ -1332,9 +1529,12 @@ class ArrayTensor(ExpressionNode):
         return f'[{self.fill_expr} tensor {self.dims_expr}]'
 
     def eval(self, scope):
-        dims = self.dims_expr.eval(scope=scope)
+        return self._tensor_of_fill(*self.eval_shape(scope))
+
+    def eval_shape(self, scope):
+        dims = self.dims_expr.eval(scope)
         err_msg = None
-        if isinstance(dims, Fraction):
+        if type(dims) is not list:
             err_msg = 'Tensor dimensions should be an array, got a number'
         elif not all(isinstance(x, Fraction) for x in dims):
             err_msg = 'Tensor dimensions should be an array of numbers only'
@@ -1348,42 +1548,55 @@ class ArrayTensor(ExpressionNode):
                 err_msg = 'Tensor dimensions must be non-negative'
         if err_msg:
             raise RailwayIndexError(err_msg, scope=scope)
-        fill = self.fill_expr.eval(scope=scope)
-        if isinstance(fill, Fraction):
-            return self._tensor_of_fill(dims, fill)
+        return dims, self.fill_expr.eval(scope)
+
+    def _tensor_of_fill(self, dims, fill):
+        # Build every innermost row up front, then group them into the
+        # outer dimensions by slicing, so each sublist is independent. A
+        # number can be shared by every cell, an array is copied into each
+        num_rows = 1
+        for dim in dims[:-1]:
+            num_rows *= dim
+        if type(fill) is not list:
+            tensor = [[fill] * dims[-1] for _ in range(num_rows)]
         else:
-            return self._tensor_copy_fill(dims, fill)
-
-    def _tensor_of_fill(self, dims, fill, depth=0):
-        if depth < len(dims) - 1:
-            return [self._tensor_of_fill(dims, fill, depth+1)
-                    for _ in range(dims[depth])]
-        return [fill] * dims[-1]
-
-    def _tensor_copy_fill(self, dims, fill, depth=0):
-        if depth < len(dims) - 1:
-            return [self._tensor_copy_fill(dims, fill, depth+1)
-                    for _ in range(dims[depth])]
-        return [deepcopy(fill) for _ in range(dims[-1])]
+            tensor = [[_copy_memory(fill) for _ in range(dims[-1])]
+                      for _ in range(num_rows)]
+        for dim in reversed(dims[1:-1]):
+            tensor = [tensor[i:i+dim] for i in range(0, len(tensor), dim)]
+        return tensor if len(dims) > 1 else tensor[0]
+
+    @staticmethod
+    def tensor_matches(memory, dims, fill):
+        # Equivalent to comparing memory with the tensor that would be built,
+        # but walks it a dimension at a time instead of allocating the tensor
+        rows = [memory]
+        for dim in dims[:-1]:
+            for row in rows:
+                if type(row) is not list or len(row) != dim:
+                    return False
+            rows = [sub for row in rows for sub in row]
+        dim = dims[-1]
+        for row in rows:
+            if type(row) is not list or len(row) != dim:
+                return False
+            if row.count(fill) != dim:
+                return False
+        return True
 
 
 # -------------------- Expressions -------------------- #
 
 class Binop(ExpressionNode):
-    __slots__ = ["lhs", "op", "rhs", "name", "__eval"]
+    __slots__ = ["lhs", "rhs", "name", "constant"]
 
-    def __init__(self, lhs, op, rhs, name="UNNAMED", **kwargs):
+    def __init__(self, lhs, rhs, name="UNNAMED", **kwargs):
         super().__init__(**kwargs)
         self.lhs = lhs
-        self.op = op
         self.rhs = rhs
         self.name = name
-        if name == '&':
-            self.__eval = self.eval_and
-        elif name == '|':
-            self.__eval = self.eval_or
-        else:
-            self.__eval = self.eval_normal
+        # A literal right hand side, as in 'i + 1', is used without an eval
+        self.constant = rhs if type(rhs) is Fraction else None
 
     def uses_var(self, name):
         return self.lhs.uses_var(name) or self.rhs.uses_var(name)
@@ -1391,33 +1604,253 @@ class Binop(ExpressionNode):
     def __repr__(self):
         return f'({self.lhs} {self.name} {self.rhs})'
 
+    def _array_error(self, scope):
+        return RailwayTypeError(
+            f'Binary operation {self.name} does not accept arrays',
+            scope=scope)
+
+    def _zero_error(self, lhs, rhs, scope):
+        return RailwayZeroError(f'{lhs} {self.name} {rhs}', scope=scope)
+
+
+# Each operator has its own Binop subclass with the operation written into
+# eval, so evaluating an expression doesn't go through the functions in
+# binops. Most values in Railway programs are whole numbers: Fraction builds
+# whole sums, differences and products itself, and the other operations that
+# keep numbers whole are far cheaper on the numerators as plain ints than
+# through Fraction's generic arithmetic, which normalises every result
+
+class BinopAdd(Binop):
+    __slots__ = []
+
     def eval(self, scope):
-        return self.__eval(scope)
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
+        result = lhs + rhs
+        return result if type(result) is Fraction else Fraction(result)
 
-    def eval_normal(self, scope):
-        lhs = self.lhs.eval(scope=scope)
-        rhs = self.rhs.eval(scope=scope)
-        if isinstance(lhs, list) or isinstance(rhs, list):
-            raise RailwayTypeError(
-                f'Binary operation {self.name} does not accept arrays',
-                scope=scope)
+
+class BinopSub(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
+        result = lhs - rhs
+        return result if type(result) is Fraction else Fraction(result)
+
+
+class BinopMul(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
+        result = lhs * rhs
+        return result if type(result) is Fraction else Fraction(result)
+
+
+class BinopDiv(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
+        try:
+            result = lhs / rhs
+        except ZeroDivisionError:
+            raise self._zero_error(lhs, rhs, scope)
+        return result if type(result) is Fraction else Fraction(result)
+
+
+class BinopPow(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
+        try:
+            result = lhs ** rhs
+        except ZeroDivisionError:
+            raise self._zero_error(lhs, rhs, scope)
+        return result if type(result) is Fraction else Fraction(result)
+
+
+class BinopIDiv(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
+        try:
+            if lhs.denominator == 1 and rhs.denominator == 1:
+                return Fraction(lhs.numerator // rhs.numerator)
+            return Fraction(lhs // rhs)
+        except ZeroDivisionError:
+            raise self._zero_error(lhs, rhs, scope)
+
+
+class BinopMod(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
         try:
-            result = self.op(lhs, rhs)
+            if lhs.denominator == 1 and rhs.denominator == 1:
+                return Fraction(lhs.numerator % rhs.numerator)
+            return Fraction(lhs % rhs)
         except ZeroDivisionError:
-            raise RailwayZeroError(f'{lhs} {self.name} {rhs}', scope=scope)
-        return Fraction(result)
+            raise self._zero_error(lhs, rhs, scope)
+
+
+class BinopXor(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
+        return _TRUE if bool(lhs) ^ bool(rhs) else _FALSE
+
 
-    def eval_and(self, scope):
-        lhs = self.lhs.eval(scope=scope)
-        if not lhs:
-            return Fraction(0)
-        return Fraction(bool(self.rhs.eval(scope=scope)))
+class BinopAnd(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        if not self.lhs.eval(scope):
+            return _FALSE
+        return _TRUE if self.rhs.eval(scope) else _FALSE
+
+
+class BinopOr(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        if self.lhs.eval(scope):
+            return _TRUE
+        return _TRUE if self.rhs.eval(scope) else _FALSE
+
+
+class BinopLess(Binop):
+    __slots__ = []
 
-    def eval_or(self, scope):
-        lhs = self.lhs.eval(scope=scope)
-        if lhs:
-            return Fraction(1)
-        return Fraction(bool(self.rhs.eval(scope=scope)))
+    def eval(self, scope):
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
+        if lhs.denominator == 1 and rhs.denominator == 1:
+            return _TRUE if lhs.numerator < rhs.numerator else _FALSE
+        return _TRUE if lhs < rhs else _FALSE
+
+
+class BinopLeq(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
+        if lhs.denominator == 1 and rhs.denominator == 1:
+            return _TRUE if lhs.numerator <= rhs.numerator else _FALSE
+        return _TRUE if lhs <= rhs else _FALSE
+
+
+class BinopGreat(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
+        if lhs.denominator == 1 and rhs.denominator == 1:
+            return _TRUE if lhs.numerator > rhs.numerator else _FALSE
+        return _TRUE if lhs > rhs else _FALSE
+
+
+class BinopGeq(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
+        if lhs.denominator == 1 and rhs.denominator == 1:
+            return _TRUE if lhs.numerator >= rhs.numerator else _FALSE
+        return _TRUE if lhs >= rhs else _FALSE
+
+
+class BinopEq(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
+        if lhs.denominator == 1 and rhs.denominator == 1:
+            return _TRUE if lhs.numerator == rhs.numerator else _FALSE
+        return _TRUE if lhs == rhs else _FALSE
+
+
+class BinopNeq(Binop):
+    __slots__ = []
+
+    def eval(self, scope):
+        lhs = self.lhs.eval(scope)
+        rhs = self.constant
+        if rhs is None:
+            rhs = self.rhs.eval(scope)
+        if type(lhs) is list or type(rhs) is list:
+            raise self._array_error(scope)
+        if lhs.denominator == 1 and rhs.denominator == 1:
+            return _TRUE if lhs.numerator != rhs.numerator else _FALSE
+        return _TRUE if lhs != rhs else _FALSE
 
 
 class Uniop(ExpressionNode):
@@ -1436,14 +1869,38 @@ class Uniop(ExpressionNode):
         return f'{self.name}{self.expr}'
 
     def eval(self, scope):
-        val = self.expr.eval(scope=scope)
-        if isinstance(val, list):
+        val = self.expr.eval(scope)
+        if type(val) is list:
             raise RailwayTypeError(
                 f'Unary operation {self.name} does not accept arrays',
                 scope=scope)
         return Fraction(self.op(val))
 
 
+class UniopNeg(Uniop):
+    __slots__ = []
+
+    def eval(self, scope):
+        val = self.expr.eval(scope)
+        if type(val) is list:
+            raise RailwayTypeError(
+                f'Unary operation {self.name} does not accept arrays',
+                scope=scope)
+        return -val
+
+
+class UniopNot(Uniop):
+    __slots__ = []
+
+    def eval(self, scope):
+        val = self.expr.eval(scope)
+        if type(val) is list:
+            raise RailwayTypeError(
+                f'Unary operation {self.name} does not accept arrays',
+                scope=scope)
+        return _FALSE if val else _TRUE
+
+
 class Length(ExpressionNode):
     __slots__ = ["lookup"]
 
@@ -1459,7 +1916,7 @@ class Length(ExpressionNode):
 
     def eval(self, scope):
         value = self.lookup.eval(scope)
-        if not isinstance(value, list):
+        if type(value) is not list:
             raise RailwayTypeError(
                 f'Taking the length of non-array in "{self.lookup.name}"',
                 scope=scope)
@@ -1484,59 +1941,77 @@ class Lookup(ExpressionNode):
         return self.name
 
     def eval(self, scope):
-        var = scope.lookup(self.name)
-        if var.isarray:  # Arrays
+        # The most evaluated node of all, so the common case of a whole local
+        # variable is handled here without calling the helpers below
+        var = (scope.monos if self.mononame else scope.locals).get(self.name)
+        if var is None:
+            var = scope.lookup(self.name)
+        if not self.index:
+            return var.memory if var.isarray else var.memory[0]
+        if var.isarray:
+            # One and two indices are unrolled. Errors are left for
+            # _index_into to diagnose and report
+            index = self.index
             try:
-                index = [int(idx.eval(scope=scope)) for idx in self.index]
-            except TypeError:
-                raise RailwayTypeError(
-                    f'Using array as index into "{self.name}"', scope=scope)
-            output = var.memory
+                if len(index) == 1:
+                    return var.memory[int(index[0].eval(scope))]
+                if len(index) == 2:
+                    return var.memory[int(index[0].eval(scope))][
+                        int(index[1].eval(scope))]
+            except (IndexError, TypeError):
+                pass
+        memory, index = self._index_into(var, scope)
+        return memory[index]
+
+    def eval_with_var(self, scope):
+        var = self.find_var(scope)
+        if not self.index:  # Whole variables, as used by push and pop
+            return var, (var.memory if var.isarray else var.memory[0])
+        memory, index = self._index_into(var, scope)
+        return var, memory[index]
+
+    def find_var(self, scope):
+        # Local variables live in scope.monos exactly when their name is a
+        # mono name, so only that table is tried before the full search
+        var = (scope.monos if self.mononame else scope.locals).get(self.name)
+        return var if var is not None else scope.lookup(self.name)
+
+    def locate(self, scope):
+        # The list and position holding an indexed element, so that it can be
+        # read and then overwritten without walking the indices twice
+        var = self.find_var(scope)
+        if var.isarray and len(self.index) == 1:
+            # As in eval, errors are left for _index_into to report
             try:
-                for idx in index:
-                    output = output[idx]
+                index = int(self.index[0].eval(scope))
+                var.memory[index]
+                return var.memory, index
             except (IndexError, TypeError):
-                index_repr = f'{self.name}[{"][".join(str(i) for i in index)}]'
-                if isinstance(output, Fraction):
-                    msg = 'Indexing into number during lookup '
-                else:
-                    msg = 'Out of bounds error accessing '
-                raise RailwayIndexError(msg + index_repr, scope=scope)
-        else:  # Non-arrays (numbers)
-            if self.index:
-                raise RailwayIndexError(
-                    f'Indexing into {self.name} which is a number',
-                    scope=scope)
-            output = var.memory[0]
-        return output
+                pass
+        return self._index_into(var, scope)
 
-    def set(self, scope, value):
-        var = scope.lookup(self.name)
+    def _index_into(self, var, scope):
+        if not var.isarray:
+            raise RailwayIndexError(
+                f'Indexing into {self.name} which is a number', scope=scope)
+        try:
+            index = [int(idx.eval(scope)) for idx in self.index]
+        except TypeError:
+            raise RailwayTypeError(
+                f'Using array as index into "{self.name}"', scope=scope)
         memory = var.memory
-        if var.isarray:
-            indices = [int(idx.eval(scope=scope)) for idx in self.index]
-            lookup_str = f'{self.name}[{",".join(str(i) for i in indices)}]'
-            try:
-                for idx in indices[:-1]:
-                    memory = memory[idx]
-                index = indices[-1]
-                if not isinstance(memory[index], Fraction):
-                    raise RailwayTypeError(
-                        f'Trying to modify array "{lookup_str}" with a number',
-                        scope=scope)
-            except (IndexError, TypeError) as e:
-                if isinstance(memory, Fraction) or isinstance(e, TypeError):
-                    msg = 'Indexing into number during lookup '
-                else:
-                    msg = 'Out of bounds error accessing '
-                raise RailwayIndexError(msg + lookup_str, scope=scope)
-        else:  # Non-array (so a number (so a special array of length 1))
-            if self.index:
-                raise RailwayIndexError(
-                    f'Indexing into {self.name} which is a number',
-                    scope=scope)
-            index = 0
-        memory[index] = value
+        try:
+            for idx in index[:-1]:
+                memory = memory[idx]
+            memory[index[-1]]
+        except (IndexError, TypeError):
+            index_repr = f'{self.name}[{"][".join(str(i) for i in index)}]'
+            if isinstance(memory, Fraction):
+                msg = 'Indexing into number during lookup '
+            else:
+                msg = 'Out of bounds error accessing '
+            raise RailwayIndexError(msg + index_repr, scope=scope)
+        return memory, index[-1]
 
 
 class ThreadID(ExpressionNode):
@@ -1552,7 +2027,7 @@ class ThreadID(ExpressionNode):
         return 'TID()'
 
     def eval(self, scope):
-        return scope.thread_num
+        return Fraction(scope.thread_num)
 
 
 class NumThreads(ExpressionNode):
@@ -1569,13 +2044,27 @@ class NumThreads(ExpressionNode):
 
     def eval(self, scope):
         if scope.thread_num == -1:
-            return scope.thread_num
+            return Fraction(-1)
         return Fraction(scope.thread_manager.num_threads)
 
 
+# Every value is either a Fraction or a list. Fraction is registered with the
+# numbers ABCs, which makes a failing isinstance check against it slow, so
+# the hot paths tell values apart by testing for list instead
 class Fraction(BuiltinFraction):
+    __slots__ = []
     hasmono = False
 
+    def __new__(cls, numerator=0, denominator=None, **kwargs):
+        # Most values are built from a single int or base class Fraction,
+        # which need none of the type checks and normalisation done there
+        if denominator is None:
+            if type(numerator) is int:
+                return _make(numerator)
+            if type(numerator) is BuiltinFraction:
+                return _adopt(numerator)
+        return super().__new__(cls, numerator, denominator, **kwargs)
+
     def uses_var(self, name):
         return False
 
@@ -1585,6 +2074,58 @@ class Fraction(BuiltinFraction):
     def eval(self, scope=None):
         return self
 
+    # Whole numbers make up most values, and the generic Fraction arithmetic
+    # normalises every result by gcd. Sums, differences and products of whole
+    # numbers are built directly instead. Other results between two Fractions
+    # are moved into this class by _adopt, which is cheaper than the full
+    # constructor callers would otherwise wrap them in
+
+    def __add__(self, other):
+        if type(other) is Fraction:
+            if self._denominator == 1 and other._denominator == 1:
+                return _make(self._numerator + other._numerator)
+            return _adopt(BuiltinFraction.__add__(self, other))
+        return BuiltinFraction.__add__(self, other)
+
+    def __sub__(self, other):
+        if type(other) is Fraction:
+            if self._denominator == 1 and other._denominator == 1:
+                return _make(self._numerator - other._numerator)
+            return _adopt(BuiltinFraction.__sub__(self, other))
+        return BuiltinFraction.__sub__(self, other)
+
+    def __mul__(self, other):
+        if type(other) is Fraction:
+            if self._denominator == 1 and other._denominator == 1:
+                return _make(self._numerator * other._numerator)
+            return _adopt(BuiltinFraction.__mul__(self, other))
+        return BuiltinFraction.__mul__(self, other)
+
+    def __truediv__(self, other):
+        if type(other) is Fraction:
+            return _adopt(BuiltinFraction.__truediv__(self, other))
+        return BuiltinFraction.__truediv__(self, other)
+
+    def __neg__(self):
+        return _make(-self._numerator, self._denominator)
+
+
+# fractions.Fraction keeps its value in the _numerator and _denominator
+# slots, always in lowest terms with a positive denominator, and its methods
+# rely on that. _make fills those slots directly, skipping the constructor's
+# type checks and gcd, so it must only be given a pair already in that form:
+# a whole number over 1, or the parts of an existing Fraction (negating the
+# numerator keeps them normalised)
+def _make(numerator, denominator=1):
+    result = object.__new__(Fraction)
+    result._numerator = numerator
+    result._denominator = denominator
+    return result
+
+
+def _adopt(value):
+    return _make(value._numerator, value._denominator)
+
 
 class Parameter:
     __slots__ = ["name", "mononame", "isborrowed"]
@@ -1600,6 +2141,9 @@ class Parameter:
     # Parameters are never eval'd
 
 
+_TRUE, _FALSE = Fraction(1), Fraction(0)
+
+
 def __modop_mul(a, b):
     if b == 0:
         raise ZeroDivisionError()
@@ -1612,25 +2156,45 @@ def __modop_div(a, b):
     return a / b
 
 
-binops = {'+': lambda a, b: a + b,
-          '-': lambda a, b: a - b,
-          '*': lambda a, b: a * b,
-          '/': lambda a, b: a / b,
-          '**': lambda a, b: a ** b,
-          '//': lambda a, b: a // b,
-          '%': lambda a, b: a % b,
+binops = {'+': operator.add,
+          '-': operator.sub,
+          '*': operator.mul,
+          '/': operator.truediv,
+          '**': operator.pow,
+          '//': operator.floordiv,
+          '%': operator.mod,
           '^': lambda a, b: bool(a) ^ bool(b),
           '|': lambda a, b: bool(a) | bool(b),
           '&': lambda a, b: bool(a) & bool(b),
-          '<': lambda a, b: a < b,
-          '<=': lambda a, b: a <= b,
-          '>': lambda a, b: a > b,
-          '>=': lambda a, b: a >= b,
-          '==': lambda a, b: a == b,
-          '!=': lambda a, b: a != b}
-
-uniops = {'!': lambda x: not bool(x),
-          '-': lambda x: -x}
+          '<': operator.lt,
+          '<=': operator.le,
+          '>': operator.gt,
+          '>=': operator.ge,
+          '==': operator.eq,
+          '!=': operator.ne}
+
+uniops = {'!': operator.not_,
+          '-': operator.neg}
+
+uniop_nodes = {'!': UniopNot,
+               '-': UniopNeg}
+
+binop_nodes = {'+': BinopAdd,
+               '-': BinopSub,
+               '*': BinopMul,
+               '/': BinopDiv,
+               '**': BinopPow,
+               '//': BinopIDiv,
+               '%': BinopMod,
+               '^': BinopXor,
+               '|': BinopOr,
+               '&': BinopAnd,
+               '<': BinopLess,
+               '<=': BinopLeq,
+               '>': BinopGreat,
+               '>=': BinopGeq,
+               '==': BinopEq,
+               '!=': BinopNeq}
 
 modops = {'+=': binops['+'],
           '-=': binops['-'],
@@ -1647,3 +2211,4 @@ inv_modops = {'+=': modops['-='],
               '-=': modops['+='],
               '*=': modops['/='],
               '/=': modops['*=']}
+
@@ -25,88 +25,62 @@ symbols = {
     '(', ')', '[', ']', '{', '}', ',', '.', '#', '!'
 }
 
-max_symbol_length = max(len(s) for s in symbols)
-
 DefaultToken = namedtuple('Token', ['type', 'string', 'line', 'col'])
 
 
+# A single pattern for every kind of token, so that each token costs one
+# match. No two kinds of token can begin with the same character, and the
+# symbols are tried longest first
+token_regex = re.compile('|'.join([
+    r'(?P<NEWLINE>\n)',
+    f'(?P<NAME>{name_regex.pattern})',
+    '(?P<SYMBOL>' + '|'.join(
+        re.escape(s) for s in sorted(symbols, key=len, reverse=True)) + ')',
+    f'(?P<NUMBER>{number_regex.pattern})',
+    f'(?P<STRING>{string_regex.pattern})',
+    f'(?P<IGNORE>{ignore_regex.pattern})',
+    f'(?P<ESCAPED_NEWLINE>{escaped_newline_regex.pattern})',
+]))
+
+
 def tokenise(data, TokenClass=DefaultToken):
     line, col = 1, 0
     pos = 0
     skip_newline = True
 
+    match = token_regex.match
     len_data = len(data)
     while pos < len_data:
+        token_match = match(data, pos)
+        if token_match is None:
+            raise RailwayLexingError(line, col)
+        kind = token_match.lastgroup
+        endpos = token_match.end()
+        string = token_match.group()
 
-        if data[pos] == '\n':
+        if kind == 'NEWLINE':
             if not skip_newline:
                 yield TokenClass('NEWLINE', '\n', line, col)
             skip_newline = True
             line += 1
             col = 0
-            pos += 1
-            continue
-
-        name_match = name_regex.match(data, pos)
-        if name_match:
-            endpos = name_match.span()[1]
-            string = data[pos:endpos]
-            if string in keywords:
-                yield TokenClass(string, string, line, col)
-            else:
-                yield TokenClass('NAME', string, line, col)
-            skip_newline = False
+        elif kind == 'ESCAPED_NEWLINE':
+            line += 1
+            col = 0
+        elif kind == 'IGNORE':
+            line += string.count('\n')
             col += endpos - pos
-            pos = endpos
-            continue
-
-        for sym_length in range(min(max_symbol_length, len_data - pos), 0, -1):
-            if data[pos:pos + sym_length] in symbols:
-                endpos = pos + sym_length
-                string = data[pos:endpos]
-                yield TokenClass(string, string, line, col)
-                skip_newline = False
-                col += sym_length
-                pos = endpos
-                break
         else:
-
-            number_match = number_regex.match(data, pos)
-            if number_match:
-                endpos = number_match.span()[1]
-                string = data[pos:endpos]
-                yield TokenClass('NUMBER', string, line, col)
-                skip_newline = False
-                col += endpos - pos
-                pos = endpos
-                continue
-
-            string_match = string_regex.match(data, pos)
-            if string_match:
-                endpos = string_match.span()[1]
-                string = data[pos+1:endpos-1]
-                yield TokenClass('STRING', string, line, col)
-                skip_newline = False
-                col += endpos - pos
-                pos = endpos
-                continue
-
-            ignore_match = ignore_regex.match(data, pos)
-            if ignore_match:
-                endpos = ignore_match.span()[1]
-                line += data[pos:endpos].count('\n')
-                col += endpos - pos
-                pos = endpos
-                continue
-
-            escaped_newline_match = escaped_newline_regex.match(data, pos)
-            if escaped_newline_match:
-                line += 1
-                col = 0
-                pos = escaped_newline_match.span()[1]
-                continue
-
-            raise RailwayLexingError(line, col)
+            if kind == 'NAME':
+                kind = string if string in keywords else 'NAME'
+            elif kind == 'SYMBOL':
+                kind = string
+            elif kind == 'STRING':
+                string = string[1:-1]
+            yield TokenClass(kind, string, line, col)
+            skip_newline = False
+            col += endpos - pos
+        pos = endpos
 
     if not skip_newline:
         yield TokenClass('NEWLINE', '\n', line, col)
@@ -1,5 +1,7 @@
 # This file was generated from the grammar file grammar.peg #
 from .pegparsing import BaseParser, memoise, memoise_left_recursive
+from sys import intern
+
 from .AST import (
     Token, ThreadID, NumThreads, Lookup, Length, Uniop, Binop, ArrayLiteral,
     ArrayTensor, ArrayRange, Let, Unlet, Promote, Pop, Push, Swap, If, Loop,
@@ -1235,7 +1237,7 @@ class RailwayParser(BaseParser):
             and (((t0 := self.expect('.')) is not None) or True)
             and ((t1 := self.expect('NAME')) is not None)
         ):
-            return ('.' if t0 is not None else '') + t1.string
+            return intern(('.' if t0 is not None else '') + t1.string)
         self.reset(pos)
 
         return None